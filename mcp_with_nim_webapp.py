@@ -9,8 +9,12 @@ A voice agent that integrates:
 
 import os
 import shutil
+import asyncio
+from itertools import islice
 import aiohttp
-import json
+import orjson
+from cachetools import TTLCache
+import riva.client
 from dotenv import load_dotenv
 from loguru import logger
 
@@ -24,8 +28,12 @@ from pipecat.audio.vad.vad_analyzer import VADParams
 from pipecat.frames.frames import (
     LLMRunFrame, 
     TTSSpeakFrame, 
+    TTSStartedFrame, 
+    TTSAudioRawFrame, 
+    TTSStoppedFrame, 
+    OutputAudioRawFrame, 
     TranscriptionFrame, 
-    TextFrame, 
+    LLMTextFrame, 
     LLMFullResponseEndFrame, 
     Frame,
     OutputTransportMessageFrame
@@ -48,11 +56,66 @@ load_dotenv(override=True)
 
 # Directory the filesystem MCP server can access
 ALLOWED_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+_ALLOWED_REALPATH = os.path.realpath(ALLOWED_DIRECTORY)
+
+# Serper API configuration
+SERPER_URL = "https://google.serper.dev/search"
+_HEADERS = {
+    'X-API-KEY': os.getenv("SERPER_API_KEY") or "",
+    'Content-Type': 'application/json'
+}
+
+# Shared HTTP session so Serper calls reuse warm keep-alive connections. The
+# runner starts one bot() per connection, so it is closed with the last one.
+_SESSION: aiohttp.ClientSession | None = None
+_ACTIVE_BOTS = 0
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it on first use"""
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=5, connect=1),
+        )
+    return _SESSION
+
+
+async def _close_session():
+    """Close the shared HTTP session if it was opened"""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
+
+# Recent search results keyed on the normalized query, plus the requests
+# currently in flight so concurrent identical queries share one HTTP call
+_SEARCH_CACHE: TTLCache = TTLCache(maxsize=256, ttl=300)
+_INFLIGHT_SEARCHES: dict[str, asyncio.Task] = {}
+
+
+def _finish_search(key: str, task: asyncio.Task):
+    """Cache a completed search unless it failed"""
+    _INFLIGHT_SEARCHES.pop(key, None)
+    if task.cancelled() or task.exception() is not None:
+        return
+    result = task.result()
+    if "error" not in result:
+        _SEARCH_CACHE[key] = result
+
 
 class UserTranscriptSender(FrameProcessor):
+    def __init__(self):
+        # Stateless pass-through, so frames can skip the input task hop
+        super().__init__(enable_direct_mode=True)
+
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
-        if isinstance(frame, TranscriptionFrame):
+        if type(frame) is TranscriptionFrame:
+            # Build a fresh message each time: the output transport queues it
+            # and serializes later, so a reused dict would be overwritten
             await self.push_frame(OutputTransportMessageFrame(message={
                 "type": "transcription", 
                 "text": frame.text
@@ -61,24 +124,82 @@ class UserTranscriptSender(FrameProcessor):
 
 class BotTranscriptSender(FrameProcessor):
     def __init__(self):
-        super().__init__()
-        self._text = ""
+        super().__init__(enable_direct_mode=True)
+        self._chunks: list[str] = []
+        # Dispatch on the concrete frame type; the LLM emits LLMTextFrame
+        self._handlers = {
+            LLMTextFrame: self._on_text,
+            LLMFullResponseEndFrame: self._on_end,
+        }
+
+    @property
+    def has_pending_text(self) -> bool:
+        """Whether the current LLM response has produced any text yet"""
+        return bool(self._chunks)
 
     async def process_frame(self, frame: Frame, direction: FrameDirection):
         await super().process_frame(frame, direction)
-        
-        if isinstance(frame, TextFrame):
-            self._text += frame.text
-        elif isinstance(frame, LLMFullResponseEndFrame):
-            if self._text:
-                await self.push_frame(OutputTransportMessageFrame(message={
-                    "type": "response",
-                    "text": self._text
-                }), direction)
-                self._text = ""
-                
+
+        handler = self._handlers.get(type(frame))
+        if handler is not None:
+            await handler(frame, direction)
+
         await self.push_frame(frame, direction)
 
+    async def _on_text(self, frame: LLMTextFrame, direction: FrameDirection):
+        # Stream each chunk so the UI can show the response as it arrives
+        self._chunks.append(frame.text)
+        await self.push_frame(OutputTransportMessageFrame(message={
+            "type": "response_delta",
+            "text": frame.text
+        }), direction)
+
+    async def _on_end(self, frame: LLMFullResponseEndFrame, direction: FrameDirection):
+        if self._chunks:
+            await self.push_frame(OutputTransportMessageFrame(message={
+                "type": "response",
+                "text": "".join(self._chunks)
+            }), direction)
+            self._chunks.clear()
+
+
+
+async def _fetch_search(query: str) -> dict:
+    """Query the Serper API and format the top results"""
+    # Only the query varies, so splice its encoded JSON string into the body
+    payload = b'{"q":' + orjson.dumps(query) + b'}'
+
+    session = await _get_session()
+    try:
+        async with session.post(SERPER_URL, headers=_HEADERS, data=payload) as response:
+            response.raise_for_status()
+            data = orjson.loads(await response.read())
+    except aiohttp.ClientResponseError as e:
+        return {"error": f"Search API returned status {e.status}"}
+    except asyncio.TimeoutError:
+        return {"error": "Search timed out"}
+
+    results = []
+
+    # Get answer box if available
+    answer_box = data.get("answerBox")
+    if answer_box:
+        answer = answer_box.get("answer") or answer_box.get("snippet")
+        if answer:
+            results.append(f"Answer: {answer}")
+
+    # Get organic results
+    organic = data.get("organic")
+    if organic:
+        for i, result in enumerate(islice(organic, 3), start=1):
+            title = result.get("title") or ""
+            snippet = result.get("snippet") or ""
+            results.append(f"{i}. {title}: {snippet}")
+
+    return {
+        "query": query,
+        "results": "\n\n".join(results) if results else "No results found"
+    }
 
 
 async def search_web(params: FunctionCallParams):
@@ -90,52 +211,30 @@ async def search_web(params: FunctionCallParams):
             await params.result_callback({"error": "No query provided"})
             return
 
-        url = "https://google.serper.dev/search"
-        headers = {
-            'X-API-KEY': os.getenv("SERPER_API_KEY"),
-            'Content-Type': 'application/json'
-        }
-        payload = json.dumps({"q": query})
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, data=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    results = []
-
-                    # Get answer box if available
-                    if "answerBox" in data:
-                        answer = data["answerBox"].get("answer") or data["answerBox"].get("snippet")
-                        if answer:
-                            results.append(f"Answer: {answer}")
-
-                    # Get organic results
-                    if "organic" in data:
-                        for i, result in enumerate(data["organic"][:3]):
-                            title = result.get("title", "")
-                            snippet = result.get("snippet", "")
-                            results.append(f"{i+1}. {title}: {snippet}")
-
-                    if results:
-                        await params.result_callback({
-                            "query": query,
-                            "results": "\n\n".join(results)
-                        })
-                    else:
-                        await params.result_callback({
-                            "query": query,
-                            "results": "No results found"
-                        })
-                else:
-                    await params.result_callback({
-                        "error": f"Search API returned status {response.status}"
-                    })
+        # Re-asked questions are answered from the cache
+        key = " ".join(query.lower().split())
+        result = _SEARCH_CACHE.get(key)
+        if result is None:
+            task = _INFLIGHT_SEARCHES.get(key)
+            if task is None:
+                task = asyncio.create_task(_fetch_search(query))
+                _INFLIGHT_SEARCHES[key] = task
+                task.add_done_callback(lambda t: _finish_search(key, t))
+            result = await asyncio.shield(task)
+
+        await params.result_callback(result)
 
     except Exception as e:
-        logger.error(f"Web search error: {str(e)}")
+        logger.error("Web search error: {}", e)
         await params.result_callback({"error": f"Failed to search: {str(e)}"})
 
 
+def _resolve_parent(file_path: str) -> str:
+    """Resolve symlinks in the parent directory of a path, keeping its final name"""
+    abs_path = os.path.abspath(file_path)
+    return os.path.join(os.path.realpath(os.path.dirname(abs_path)), os.path.basename(abs_path))
+
+
 async def delete_file(params: FunctionCallParams):
     """Delete a file from the allowed directory"""
     try:
@@ -145,35 +244,176 @@ async def delete_file(params: FunctionCallParams):
             await params.result_callback({"error": "No file path provided"})
             return
 
-        # Security check: ensure the file is within the allowed directory
-        abs_path = os.path.abspath(file_path)
-        if not abs_path.startswith(ALLOWED_DIRECTORY):
+        # Security check: ensure the file is within the allowed directory. Only
+        # the parent is resolved, so a symlink is removed rather than its target.
+        abs_path = await asyncio.to_thread(_resolve_parent, file_path)
+        if os.path.commonpath([abs_path, _ALLOWED_REALPATH]) != _ALLOWED_REALPATH:
             await params.result_callback({
                 "error": f"Cannot delete files outside of {ALLOWED_DIRECTORY}"
             })
             return
 
-        if not os.path.exists(abs_path):
+        # Delete the file, letting the single unlink call report what went wrong
+        try:
+            await asyncio.to_thread(os.remove, abs_path)
+        except FileNotFoundError:
             await params.result_callback({"error": f"File not found: {file_path}"})
             return
-
-        if os.path.isdir(abs_path):
+        except IsADirectoryError:
             await params.result_callback({"error": "Cannot delete directories, only files"})
             return
-
-        # Delete the file
-        os.remove(abs_path)
-        logger.info(f"Deleted file: {abs_path}")
+        except PermissionError:
+            # macOS reports unlinking a directory as a permission error
+            if await asyncio.to_thread(os.path.isdir, abs_path):
+                await params.result_callback({"error": "Cannot delete directories, only files"})
+                return
+            raise
+
+        logger.info("Deleted file: {}", abs_path)
         await params.result_callback({
             "success": True,
             "message": f"Successfully deleted {os.path.basename(abs_path)}"
         })
 
     except Exception as e:
-        logger.error(f"Delete file error: {str(e)}")
+        logger.error("Delete file error: {}", e)
         await params.result_callback({"error": f"Failed to delete file: {str(e)}"})
 
 
+# Define web search function schema
+web_search_function = FunctionSchema(
+    name="search_web",
+    description="IMMEDIATELY search the web when user asks about current events, facts, or requests a search. Required for any information you don't know.",
+    properties={
+        "query": {
+            "type": "string",
+            "description": "The search query to look up on the web.",
+        },
+    },
+    required=["query"],
+)
+
+# Define delete file function schema
+delete_file_function = FunctionSchema(
+    name="delete_file",
+    description="Permanently delete a file from the filesystem. Use this when the user asks to delete or remove a file.",
+    properties={
+        "path": {
+            "type": "string",
+            "description": "The full path to the file to delete.",
+        },
+    },
+    required=["path"],
+)
+
+# Custom functions shared by every connection; MCP tools are added per session
+_BASE_TOOLS = ToolsSchema(standard_tools=[web_search_function, delete_file_function])
+
+# System prompt explaining capabilities. It is sent verbatim on every turn, so
+# keeping it (and the tool list order) byte-identical lets NIM reuse the
+# cached prefix instead of re-prefilling it.
+SYSTEM_PROMPT = f"""You are Sofia, Rakshit's advanced voice assistant in a real-time voice call.
+
+RESPONSE FORMAT (CRITICAL):
+- Use plain spoken language only
+- No asterisks, markdown, emojis, or special characters
+- Use "first, second, third" instead of bullet points
+- Natural conversational tone
+
+AVAILABLE TOOLS:
+- File operations: read, create, list, search, delete files.
+- Web search: search current information online
+- File deletion: remove files from project directory {ALLOWED_DIRECTORY}
+
+IMPORTANT: When user requests actions, USE the appropriate tool immediately. Confirm actions after completion in simple language.
+EXAMPLES:
+❌ WRONG: "Sure, I'll delete the file for you."
+✅ CORRECT: [Call delete_file tool, then say] "File deleted successfully."
+
+Start by introducing yourself briefly."""
+
+
+# NIM TTS settings shared by the session services and the filler renderer
+TTS_SERVER = "grpc.nvcf.nvidia.com:443"
+TTS_MODEL = {
+    "function_id": "877104f7-e885-42b9-8de8-f6e4c6303969",
+    "model_name": "magpie-tts-multilingual",
+}
+TTS_VOICE_ID = "Magpie-Multilingual.EN-US.Aria"
+TTS_LANGUAGE = "en-US"
+
+# Spoken while tools run; rendered once per process and replayed from memory
+FILLER_SEARCH = "Let me search that for you."
+FILLER_DELETE = "Deleting the file."
+FILLER_DEFAULT = "Processing your request."
+FILLER_PHRASES = (FILLER_SEARCH, FILLER_DELETE, FILLER_DEFAULT)
+
+# Rendered filler PCM keyed on (voice_id, sample_rate), then phrase
+_FILLER_AUDIO: dict[tuple[str, int], dict[str, bytes]] = {}
+_FILLER_AUDIO_LOCK = asyncio.Lock()
+
+
+def _render_fillers(sample_rate: int) -> dict[str, bytes]:
+    """Synthesize the filler phrases with a dedicated Riva client"""
+    auth = riva.client.Auth(
+        use_ssl=True,
+        uri=TTS_SERVER,
+        metadata_args=[
+            ["function-id", TTS_MODEL["function_id"]],
+            ["authorization", f"Bearer {os.getenv('NVIDIA_API_KEY')}"],
+        ],
+    )
+    service = riva.client.SpeechSynthesisService(auth)
+    return {
+        phrase: service.synthesize(
+            phrase,
+            voice_name=TTS_VOICE_ID,
+            language_code=TTS_LANGUAGE,
+            sample_rate_hz=sample_rate,
+        ).audio
+        for phrase in FILLER_PHRASES
+    }
+
+
+async def _ensure_filler_audio(sample_rate: int):
+    """Render the filler phrases for a sample rate unless already cached"""
+    key = (TTS_VOICE_ID, sample_rate)
+    async with _FILLER_AUDIO_LOCK:
+        if key not in _FILLER_AUDIO:
+            _FILLER_AUDIO[key] = await asyncio.to_thread(_render_fillers, sample_rate)
+
+
+# Filesystem MCP server. pipecat's stdio MCPClient starts a fresh npx subprocess
+# for each list_tools and each tool call, so what is shared across connections
+# is the npx lookup and the tool schema, which is fetched once.
+_NPX = shutil.which("npx")
+_MCP_CLIENT: MCPClient | None = None
+_MCP_TOOLS: ToolsSchema | None = None
+_MCP_TOOLS_LOCK = asyncio.Lock()
+
+
+def _get_mcp_client() -> MCPClient:
+    """Return the shared filesystem MCP client, creating it on first use"""
+    global _MCP_CLIENT
+    if _MCP_CLIENT is None:
+        _MCP_CLIENT = MCPClient(
+            server_params=StdioServerParameters(
+                command=_NPX,
+                args=["-y", "@modelcontextprotocol/server-filesystem", ALLOWED_DIRECTORY],
+            )
+        )
+    return _MCP_CLIENT
+
+
+async def _get_mcp_tools() -> ToolsSchema:
+    """Return the filesystem MCP tool schema, fetching it on first use"""
+    global _MCP_TOOLS
+    async with _MCP_TOOLS_LOCK:
+        if _MCP_TOOLS is None:
+            _MCP_TOOLS = await _get_mcp_client().get_tools_schema()
+    return _MCP_TOOLS
+
+
 # Transport configuration for WebRTC
 transport_params = {
     "webrtc": lambda: TransportParams(
@@ -185,111 +425,95 @@ transport_params = {
 
 
 async def run_bot(transport: BaseTransport, runner_args: RunnerArguments):
-    logger.info(f"Starting MCP with NIM Voice Agent")
-    logger.info(f"Filesystem access allowed in: {ALLOWED_DIRECTORY}")
-
-    # Initialize Nvidia NIM services
+    logger.info("Starting MCP with NIM Voice Agent")
+    logger.info("Filesystem access allowed in: {}", ALLOWED_DIRECTORY)
+
+    # Initialize Nvidia NIM services. The TTS constructor makes a blocking gRPC
+    # config call, so it runs in a thread alongside the MCP tool schema fetch.
+    tts, mcp_tools = await asyncio.gather(
+        asyncio.to_thread(
+            NvidiaTTSService,
+            api_key=os.getenv("NVIDIA_API_KEY"),
+            server=TTS_SERVER,
+            voice_id=TTS_VOICE_ID,
+            model_function_map=TTS_MODEL,
+        ),
+        _get_mcp_tools(),
+    )
     stt = NvidiaSTTService(api_key=os.getenv("NVIDIA_API_KEY"))
-    tts = NvidiaTTSService(api_key=os.getenv("NVIDIA_API_KEY"))
     llm = NvidiaLLMService(
         api_key=os.getenv("NVIDIA_API_KEY"),
         model="nvidia/nemotron-3-nano-30b-a3b",
         params=NvidiaLLMService.InputParams(temperature=0.0),
     )
 
-    # Initialize Filesystem MCP Client
-    mcp_filesystem = MCPClient(
-        server_params=StdioServerParameters(
-            command=shutil.which("npx"),
-            args=["-y", "@modelcontextprotocol/server-filesystem", ALLOWED_DIRECTORY],
-        )
-    )
-
     # Register MCP tools with the LLM (filesystem operations)
-    mcp_tools = await mcp_filesystem.register_tools(llm)
+    await _get_mcp_client().register_tools_schema(mcp_tools, llm)
 
     # Register custom functions manually
     llm.register_function("search_web", search_web)
     llm.register_function("delete_file", delete_file)
 
+    bot_transcript = BotTranscriptSender()
+
+    async def prerender_fillers():
+        try:
+            await _ensure_filler_audio(tts.sample_rate)
+        except Exception as e:
+            logger.warning("Failed to pre-render filler phrases: {}", e)
+
     @llm.event_handler("on_function_calls_started")
     async def on_function_calls_started(service, function_calls):
         # Provide feedback when tools are being used
         function_names = [fc.function_name for fc in function_calls]
         if "search_web" in function_names:
-            await tts.queue_frame(TTSSpeakFrame("Let me search that for you."))
+            phrase = FILLER_SEARCH
         elif "delete_file" in function_names:
-            await tts.queue_frame(TTSSpeakFrame("Deleting the file."))
+            phrase = FILLER_DELETE
         else:
-            await tts.queue_frame(TTSSpeakFrame("Processing your request."))
-
-    # Define web search function schema
-    web_search_function = FunctionSchema(
-        name="search_web",
-        description="IMMEDIATELY search the web when user asks about current events, facts, or requests a search. Required for any information you don't know.",
-        properties={
-            "query": {
-                "type": "string",
-                "description": "The search query to look up on the web.",
-            },
-        },
-        required=["query"],
-    )
-
-    # Define delete file function schema
-    delete_file_function = FunctionSchema(
-        name="delete_file",
-        description="Permanently delete a file from the filesystem. Use this when the user asks to delete or remove a file.",
-        properties={
-            "path": {
-                "type": "string",
-                "description": "The full path to the file to delete.",
-            },
-        },
-        required=["path"],
-    )
+            phrase = FILLER_DEFAULT
+
+        # Play cached audio without a TTS round trip. The first tool call renders
+        # the cache in the background instead.
+        audio = _FILLER_AUDIO.get((TTS_VOICE_ID, tts.sample_rate), {}).get(phrase)
+        if audio and bot_transcript.has_pending_text:
+            # TTS may still be speaking the LLM's preamble, so queue the filler
+            # behind it rather than splicing it into the output audio
+            await tts.queue_frame(TTSStartedFrame())
+            await tts.queue_frame(TTSAudioRawFrame(
+                audio=audio, sample_rate=tts.sample_rate, num_channels=1
+            ))
+            await tts.queue_frame(TTSStoppedFrame())
+        elif audio:
+            await transport.output().queue_frame(OutputAudioRawFrame(
+                audio=audio, sample_rate=tts.sample_rate, num_channels=1
+            ))
+        else:
+            await tts.queue_frame(TTSSpeakFrame(phrase))
+            tts.create_task(prerender_fillers())
 
     # Combine MCP tools with custom functions
-    all_tools = ToolsSchema(standard_tools=[web_search_function, delete_file_function])
-    
+    all_tools = ToolsSchema(standard_tools=list(_BASE_TOOLS.standard_tools))
+
     # Merge MCP tools if available
     if mcp_tools and mcp_tools.standard_tools:
         all_tools.standard_tools.extend(mcp_tools.standard_tools)
 
-    # System prompt explaining capabilities
-    system_prompt = f"""You are Sofia, Rakshit's advanced voice assistant in a real-time voice call.
-
-RESPONSE FORMAT (CRITICAL):
-- Use plain spoken language only
-- No asterisks, markdown, emojis, or special characters
-- Use "first, second, third" instead of bullet points
-- Natural conversational tone
-
-AVAILABLE TOOLS:
-- File operations: read, create, list, search, delete files.
-- Web search: search current information online
-- File deletion: remove files from project directory {ALLOWED_DIRECTORY}
-
-IMPORTANT: When user requests actions, USE the appropriate tool immediately. Confirm actions after completion in simple language.
-EXAMPLES:
-❌ WRONG: "Sure, I'll delete the file for you."
-✅ CORRECT: [Call delete_file tool, then say] "File deleted successfully."
-
-Start by introducing yourself briefly."""
-
-
-    messages = [{"role": "system", "content": system_prompt}]
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}]
 
     context = LLMContext(messages, all_tools)
     context_aggregator = LLMContextAggregatorPair(context)
 
+    # Each processor drains its own queue, so the LLM keeps streaming while TTS
+    # speaks. The assistant aggregator stays after transport.output() so the
+    # context only records text that was actually spoken before an interruption.
     pipeline = Pipeline([
         transport.input(),
         stt,
         UserTranscriptSender(),
         context_aggregator.user(),
         llm,
-        BotTranscriptSender(),
+        bot_transcript,
         tts,
         transport.output(),
         context_aggregator.assistant(),
@@ -320,10 +544,18 @@ Start by introducing yourself briefly."""
 
 async def bot(runner_args: RunnerArguments):
     """Main bot entry point compatible with Pipecat Cloud."""
-    transport = await create_transport(runner_args, transport_params)
-    await run_bot(transport, runner_args)
+    global _ACTIVE_BOTS
+    _ACTIVE_BOTS += 1
+    try:
+        transport = await create_transport(runner_args, transport_params)
+        await run_bot(transport, runner_args)
+    finally:
+        _ACTIVE_BOTS -= 1
+        if _ACTIVE_BOTS == 0:
+            await _close_session()
 
 
 if __name__ == "__main__":
+    # The runner serves through uvicorn, which picks up uvloop automatically when installed
     from pipecat.runner.run import main
     main()
@@ -17,6 +17,7 @@ let dataChannel = null;
 let isConnected = false;
 let isMuted = false;
 let volume = 0.8;
+let streamingBotMessage = null;
 
 // DOM Elements
 const connectBtn = document.getElementById('connectBtn');
@@ -316,8 +317,10 @@ function handleDataChannelMessage(event) {
 
         if (data.type === 'transcription') {
             addMessage('user', data.text);
+        } else if (data.type === 'response_delta') {
+            appendBotDelta(data.text);
         } else if (data.type === 'response') {
-            addMessage('bot', data.text);
+            finalizeBotMessage(data.text);
         }
     } catch (error) {
         console.log('Data channel message:', event.data);
@@ -344,6 +347,26 @@ function addMessage(sender, text) {
 
     conversationContainer.appendChild(messageEl);
     scrollToBottom();
+    return messageEl;
+}
+
+function appendBotDelta(text) {
+    // Deltas are append-only; start a new bot message on the first one
+    if (!streamingBotMessage) {
+        streamingBotMessage = addMessage('bot', '');
+    }
+    streamingBotMessage.querySelector('.text').textContent += text;
+    scrollToBottom();
+}
+
+function finalizeBotMessage(text) {
+    if (streamingBotMessage) {
+        streamingBotMessage.querySelector('.text').textContent = text;
+        streamingBotMessage = null;
+        scrollToBottom();
+    } else {
+        addMessage('bot', text);
+    }
 }
 
 function addSystemMessage(text) {
@@ -364,6 +387,7 @@ function addSystemMessage(text) {
 }
 
 function clearConversation() {
+    streamingBotMessage = null;
     conversationContainer.innerHTML = `
         <div class="welcome-message">
             <p>👋 Welcome! Connect to start talking with the voice agent.</p>